@@ -0,0 +1,175 @@
+"""
+Serve the application across several worker processes.
+
+The application is imported once in the supervisor and each worker is forked from it,
+opening its own MongoDB pool on first use. Run from the repository root with:
+
+    python -m app --workers 4
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+
+from settings import settings
+
+
+logger = logging.getLogger("backoffice.server")
+
+
+def parse_arguments():
+    """
+    Parse the command line arguments, defaulting to the settings
+    """
+    parser = argparse.ArgumentParser(prog="python -m app", description="Serve the backoffice API.")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.GRACEFUL_TIMEOUT)
+    parser.add_argument(
+        "--proxy-headers",
+        action=argparse.BooleanOptionalAction,
+        default=settings.PROXY_HEADERS,
+        help="Trust the X-Forwarded-For and X-Forwarded-Proto headers sent by the proxies in --forwarded-allow-ips.",
+    )
+    parser.add_argument(
+        "--forwarded-allow-ips",
+        default=settings.FORWARDED_ALLOW_IPS,
+        help="Comma separated IPs of the trusted proxies, or * to trust every client.",
+    )
+    return parser.parse_args()
+
+
+def server_config(app, arguments):
+    """
+    Build the uvicorn configuration of a worker
+
+    :param app: the ASGI application
+    :param arguments: the command line arguments
+    """
+    return uvicorn.Config(
+        app,
+        lifespan="on",
+        timeout_graceful_shutdown=arguments.graceful_timeout,
+        proxy_headers=arguments.proxy_headers,
+        forwarded_allow_ips=arguments.forwarded_allow_ips,
+    )
+
+
+def bind_socket(host, port):
+    """
+    Bind the listening socket shared by every worker
+
+    :param host: the host to bind
+    :param port: the port to bind
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """
+    Fork the workers from the preloaded application and stop them gracefully
+    """
+    def __init__(self, app, sock, workers, arguments):
+        """
+        :param app: the preloaded ASGI application
+        :param sock: the listening socket
+        :param workers: the number of worker processes
+        :param arguments: the command line arguments configuring each worker
+        """
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.arguments = arguments
+        self.children = set()
+        self.stopping = False
+
+
+    def spawn(self):
+        """
+        Fork a worker serving the application on the shared socket
+        """
+        pid = os.fork()
+
+        if pid:
+            self.children.add(pid)
+            return
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        uvicorn.Server(server_config(self.app, self.arguments)).run(sockets=[self.sock])
+        os._exit(0)
+
+
+    def stop(self, signum, frame):
+        """
+        Ask every worker to drain its in-flight requests and exit
+        """
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.discard(pid)
+
+
+    def run(self):
+        """
+        Start the workers and replace the ones exiting unexpectedly until stopped
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            self.children.discard(pid)
+
+            if not self.stopping:
+                logger.warning("Worker %s exited with status %s, restarting", pid, status)
+                time.sleep(1)
+                if not self.stopping:
+                    self.spawn()
+
+        self.sock.close()
+
+
+def main():
+    arguments = parse_arguments()
+
+    if "MAX_CONCURRENT_HASHES" not in os.environ:
+        settings.MAX_CONCURRENT_HASHES = max(1, (os.cpu_count() or 1) // max(1, arguments.workers))
+
+    from main import app
+
+    sock = bind_socket(arguments.host, arguments.port)
+
+    if arguments.workers <= 1:
+        uvicorn.Server(server_config(app, arguments)).run(sockets=[sock])
+        return
+
+    Supervisor(app, sock, arguments.workers, arguments).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 from datetime import datetime
 
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, Request, status, HTTPException
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
-from services import verify_password, Authorize
+from services import verify_password, Authorize, LoginThrottle, current_tenant, use_tenant
 
 from authentication import SignInModel, ReturnLoginModel, ReturnRefreshModel, RefreshModel
 
@@ -15,19 +15,27 @@ auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @auth_router.post("/login", status_code=status.HTTP_200_OK, response_model=ReturnLoginModel, summary="Endpoint to authenticate the user.")
-async def login(data: SignInModel):
+async def login(data: SignInModel, request: Request):
     """
     # Login
 
+    ## Headers
+    - **X-Company-Id**: The company of the user, omitted for the default database.
+
     ## Request Body
     - **username**: The username of the user.
     - **password**: The password of the user.
 
     ## Responses
     - **200 OK**: Returns a dictionary containing the JWT token upon successful authentication.
-    - **400 Bad Request**: If the user is not found or if the username/password is incorrect.
+    - **400 Bad Request**: If the company or the user is not found or if the username/password is incorrect.
     - **401 Unauthorized**: If the user is not active.
+    - **429 Too Many Requests**: If the login attempts or the hashing capacity are exhausted.
     """
+    LoginThrottle.admit(data.username, request.client.host if request.client else "unknown")
+
+    use_tenant(request.headers.get("x-company-id"))
+
     user = Users.find_one({"username": data.username}, {"_id": 0})
 
     if not user:
@@ -42,7 +50,7 @@ async def login(data: SignInModel):
             detail="User is not active, please contact the suport.",
         )
     
-    if not verify_password(data.password, user["password"]):
+    if not await LoginThrottle.run_hash(verify_password, data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or password is incorrect, please try again.",
@@ -54,6 +62,7 @@ async def login(data: SignInModel):
         "last_name": user["last_name"],
         "email": user["email"],
         "role_id": user["role_id"],
+        "company_id": current_tenant.get(),
     }
 
     access_token = Authorize.create_access_token(token_data)
@@ -101,6 +110,8 @@ async def refresh(data: RefreshModel):
             detail="Invalid or expired refresh token, please login again.",
         )
     
+    use_tenant(token_data.get("company_id"))
+
     user = Users.find_one({"id": token_data["user_id"]}, {"_id": 0})
 
     if not user["is_active"]:
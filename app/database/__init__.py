@@ -1,5 +1,15 @@
-from .base import database
+from .base import BaseConnection
+
+from .tenancy import TenantRegistry
+
+from .storage import Storage, MongoStorage, get_storage
+
+from .sessions import CausalConsistencyMiddleware
 
 from .collections import Collections
 
-__all__ = ["database", "Collections"]
\ No newline at end of file
+from .singleflight import SingleFlight, coalesce
+
+from .profiling import SlowQueryLog, profiled
+
+__all__ = ["BaseConnection", "TenantRegistry", "Storage", "MongoStorage", "get_storage", "CausalConsistencyMiddleware", "Collections", "SingleFlight", "coalesce", "SlowQueryLog", "profiled"]
\ No newline at end of file
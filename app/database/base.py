@@ -1,7 +1,39 @@
-from pymongo import MongoClient
+import os
+
+from pymongo import MongoClient, monitoring
 
 from settings import settings
 
+from services.tracing import current_span
+
+
+class CommandTracer(monitoring.CommandListener):
+    """
+    Listener creating a span for every MongoDB command sent inside a sampled trace.
+    """
+
+    def __init__(self):
+        self.spans = {}
+
+    def started(self, event):
+        parent = current_span.get()
+        if parent is not None:
+            self.spans[(event.connection_id, event.request_id)] = parent.child(
+                f"mongo.{event.command_name}",
+                database=event.database_name,
+            )
+
+    def succeeded(self, event):
+        span = self.spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.finish()
+
+    def failed(self, event):
+        span = self.spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.status = "error"
+            span.finish()
+
 
 class Index(type):
     """
@@ -22,18 +54,54 @@ class Index(type):
 class BaseConnection:
     """
     Base class to connect to MongoDB.
+
+    The client is created on first use so importing the application never opens a connection.
     """
-    if settings.MONGO_SSL is True:
-        connection = MongoClient(
-            settings.MONGO_URL,
-            tls=True,
-            tlsCAFile=settings.PATH_CERT,
-            tlsAllowInvalidHostnames=True,
-            retryWrites=False,
-            directConnection=True,
-        )
-    else:
-        connection = MongoClient(settings.MONGO_URL)
+    connection = None
+
+    @classmethod
+    def get_connection(cls):
+        """
+        Return the MongoDB client, creating it if needed.
+        """
+        if cls.connection is None:
+            options = {"event_listeners": [CommandTracer()]} if settings.TRACING_ENABLED else {}
+
+            if settings.MONGO_SSL is True:
+                BaseConnection.connection = MongoClient(
+                    settings.MONGO_URL,
+                    tls=True,
+                    tlsCAFile=settings.PATH_CERT,
+                    tlsAllowInvalidHostnames=True,
+                    retryWrites=False,
+                    directConnection=settings.MONGO_DIRECT_CONNECTION,
+                    **options,
+                )
+            else:
+                BaseConnection.connection = MongoClient(settings.MONGO_URL, **options)
+
+        return cls.connection
+
+
+    @classmethod
+    def close_connection(cls):
+        """
+        Close the MongoDB client if it was created.
+        """
+        if BaseConnection.connection is not None:
+            BaseConnection.connection.close()
+            BaseConnection.connection = None
+
+
+    @classmethod
+    def reset_after_fork(cls):
+        """
+        Drop the client inherited from the parent process so the child opens its own pool.
+        """
+        BaseConnection.connection = None
+
+
+os.register_at_fork(after_in_child=BaseConnection.reset_after_fork)
 
 
 class BaseDB(BaseConnection, metaclass=Index):
@@ -45,5 +113,9 @@ class BaseDB(BaseConnection, metaclass=Index):
     """
     database = settings.DATABASE_ENVIRONMENT
 
-
-database = BaseDB.connection[BaseDB.database]
+    @classmethod
+    def get_database(cls):
+        """
+        Return the database of the environment.
+        """
+        return cls.get_connection()[cls.database]
@@ -10,3 +10,4 @@ class Collections(str, Enum):
 
     COMPANIES = "companies"
     USERS = "users"
+    IDEMPOTENCY_KEYS = "idempotency_keys"
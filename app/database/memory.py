@@ -0,0 +1,328 @@
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from threading import RLock
+from time import monotonic
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import DeleteResult, InsertOneResult, UpdateResult
+
+from .storage import Storage
+
+
+MISSING = object()
+
+
+OPERATORS = {
+    "$eq": lambda value, argument: value is not MISSING and value == argument,
+    "$ne": lambda value, argument: value is MISSING or value != argument,
+    "$in": lambda value, argument: value is not MISSING and value in argument,
+    "$nin": lambda value, argument: value is MISSING or value not in argument,
+    "$exists": lambda value, argument: (value is not MISSING) == bool(argument),
+}
+
+
+def is_operator_condition(condition):
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def matches(document, query):
+    """
+    Check if a document matches a query
+
+    :param document: the document to check
+    :param query: the query to match
+    """
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(document, sub_query) for sub_query in condition):
+                return False
+            continue
+
+        if key == "$or":
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+            continue
+
+        value = document.get(key, MISSING)
+
+        if is_operator_condition(condition):
+            for operator, argument in condition.items():
+                if operator not in OPERATORS:
+                    raise NotImplementedError(f"Operator {operator} is not supported by the memory storage")
+                if not OPERATORS[operator](value, argument):
+                    return False
+
+        elif value is MISSING or value != condition:
+            return False
+
+    return True
+
+
+def project(document, projection):
+    """
+    Apply a projection to a copy of the document
+
+    :param document: the document to project
+    :param projection: the fields to include or exclude
+    """
+    if not projection:
+        return deepcopy(document)
+
+    include_id = bool(projection.get("_id", True))
+    included = [field for field, flag in projection.items() if field != "_id" and flag]
+
+    if included:
+        result = {field: deepcopy(document[field]) for field in included if field in document}
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+
+    result = {field: deepcopy(value) for field, value in document.items() if field not in projection}
+    if include_id and "_id" in document:
+        result["_id"] = document["_id"]
+    return result
+
+
+def apply_update(document, update):
+    """
+    Apply the update operators to the document in place
+
+    :param document: the document to update
+    :param update: the update operators to apply
+    :return: whether the document changed
+    """
+    changed = False
+
+    for operator, fields in update.items():
+        if operator == "$set":
+            for field, value in fields.items():
+                if document.get(field, MISSING) != value:
+                    document[field] = deepcopy(value)
+                    changed = True
+
+        elif operator == "$unset":
+            for field in fields:
+                if field in document:
+                    del document[field]
+                    changed = True
+
+        else:
+            raise NotImplementedError(f"Update operator {operator} is not supported by the memory storage")
+
+    return changed
+
+
+class MemoryStorage(Storage):
+    """
+    Storage keeping the documents in memory with hash indexes on the configured fields
+    """
+    def __init__(self, indexes=()):
+        """
+        :param indexes: the fields to index
+        """
+        self.lock = RLock()
+        self.documents = {}
+        self.positions = {}
+        self.indexes = {field: {} for field in indexes}
+        self.unique = set()
+        self.expirations = {}
+        self.expired_at = monotonic()
+        self.sequence = count()
+
+
+    def _expire(self):
+        """
+        Remove the documents past the expiration of the TTL indexes, at most once per second
+        """
+        if not self.expirations or monotonic() - self.expired_at < 1:
+            return
+
+        self.expired_at = monotonic()
+        now = datetime.now(timezone.utc)
+
+        for field, seconds in self.expirations.items():
+            deadline = now - timedelta(seconds=seconds)
+            for key, document in list(self.documents.items()):
+                value = document.get(field)
+                if not isinstance(value, datetime):
+                    continue
+                if value.tzinfo is None:
+                    value = value.replace(tzinfo=timezone.utc)
+                if value < deadline:
+                    self._remove(key, document)
+
+
+    def _remove(self, key, document):
+        self._unindex(key, document)
+        del self.documents[key]
+        del self.positions[key]
+
+
+    def _check_unique(self, document, key=None):
+        for field in self.unique:
+            if field in document and self.indexes[field].get(document[field], set()) - {key}:
+                raise DuplicateKeyError(f"Duplicate key for index {field}: {document[field]!r}")
+
+
+    def _index(self, key, document):
+        for field, index in self.indexes.items():
+            if field in document:
+                index.setdefault(document[field], set()).add(key)
+
+
+    def _unindex(self, key, document):
+        for field, index in self.indexes.items():
+            if field in document:
+                keys = index.get(document[field])
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[document[field]]
+
+
+    def _plan(self, query):
+        """
+        Choose the index used to narrow the candidates of a query
+
+        :return: the indexed field and its candidate keys, or None for a collection scan
+        """
+        for field, condition in query.items():
+            if field not in self.indexes:
+                continue
+
+            index = self.indexes[field]
+
+            if not isinstance(condition, dict):
+                return field, set(index.get(condition, ()))
+
+            if set(condition) == {"$in"}:
+                keys = set()
+                for value in condition["$in"]:
+                    keys.update(index.get(value, ()))
+                return field, keys
+
+        return None
+
+
+    def _matching(self, query, limit=None):
+        self._expire()
+        plan = self._plan(query)
+        candidates = self.documents if plan is None else sorted(plan[1], key=self.positions.get)
+
+        found = []
+        for key in candidates:
+            document = self.documents[key]
+            if matches(document, query):
+                found.append((key, document))
+                if limit is not None and len(found) >= limit:
+                    break
+
+        return found
+
+
+    def find_one(self, query, projection=None, read_preference=None):
+        with self.lock:
+            found = self._matching(query, limit=1)
+            return project(found[0][1], projection) if found else None
+
+
+    def find(self, query, projection=None, read_preference=None):
+        with self.lock:
+            return [project(document, projection) for _, document in self._matching(query)]
+
+
+    def insert_one(self, document):
+        with self.lock:
+            self._expire()
+            document.setdefault("_id", ObjectId())
+            if document["_id"] in self.documents:
+                raise DuplicateKeyError(f"Duplicate key for index _id: {document['_id']!r}")
+            self._check_unique(document)
+            stored = deepcopy(document)
+            self.documents[stored["_id"]] = stored
+            self.positions[stored["_id"]] = next(self.sequence)
+            self._index(stored["_id"], stored)
+            return InsertOneResult(stored["_id"], True)
+
+
+    def _update(self, key, document, update):
+        updated = deepcopy(document)
+        changed = apply_update(updated, update)
+        self._check_unique(updated, key)
+        self._unindex(key, document)
+        document.clear()
+        document.update(updated)
+        self._index(key, document)
+        return changed
+
+
+    def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE):
+        with self.lock:
+            found = self._matching(query, limit=1)
+            if not found:
+                return None
+
+            key, document = found[0]
+            before = deepcopy(document)
+            self._update(key, document, update)
+            return deepcopy(document) if return_document == ReturnDocument.AFTER else before
+
+
+    def update_one(self, query, update):
+        with self.lock:
+            found = self._matching(query, limit=1)
+            modified = sum(self._update(key, document, update) for key, document in found)
+            return UpdateResult({"n": len(found), "nModified": modified, "ok": 1.0}, True)
+
+
+    def update_many(self, query, update):
+        with self.lock:
+            found = self._matching(query)
+            modified = sum(self._update(key, document, update) for key, document in found)
+            return UpdateResult({"n": len(found), "nModified": modified, "ok": 1.0}, True)
+
+
+    def delete_one(self, query):
+        with self.lock:
+            found = self._matching(query, limit=1)
+            for key, document in found:
+                self._remove(key, document)
+            return DeleteResult({"n": len(found), "ok": 1.0}, True)
+
+
+    def create_index(self, field, unique=False, expire_after_seconds=None):
+        with self.lock:
+            if field not in self.indexes:
+                self.indexes[field] = {}
+                for key, document in self.documents.items():
+                    if field in document:
+                        self.indexes[field].setdefault(document[field], set()).add(key)
+            if unique:
+                self.unique.add(field)
+            if expire_after_seconds is not None:
+                self.expirations[field] = expire_after_seconds
+            return field
+
+
+    def explain(self, query, projection=None):
+        with self.lock:
+            plan = self._plan(query)
+            returned = len(self._matching(query))
+
+            if plan is None:
+                return {
+                    "winning_plan": {"stage": "COLLSCAN"},
+                    "docs_examined": len(self.documents),
+                    "keys_examined": 0,
+                    "returned": returned,
+                }
+
+            return {
+                "winning_plan": {"stage": "IXSCAN", "index": plan[0]},
+                "docs_examined": len(plan[1]),
+                "keys_examined": len(plan[1]),
+                "returned": returned,
+            }
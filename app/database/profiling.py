@@ -0,0 +1,188 @@
+import json
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+from settings import settings
+
+from services.tracing import Tracer
+
+
+logger = logging.getLogger(__name__)
+
+
+def query_shape(query):
+    """
+    Replace the values of a query by their type, keeping keys and operators
+
+    :param query: the query to be shaped
+    """
+    if isinstance(query, dict):
+        return {key: query_shape(value) for key, value in query.items()}
+
+    if isinstance(query, (list, tuple)):
+        return [query_shape(value) for value in query[:1]]
+
+    return type(query).__name__
+
+
+def result_count(result):
+    """
+    Count the documents returned or affected by an operation
+
+    :param result: the result of the operation
+    """
+    if result is None:
+        return 0
+
+    if isinstance(result, list):
+        return len(result)
+
+    if isinstance(result, dict):
+        return 1
+
+    if hasattr(result, "matched_count"):
+        return result.matched_count
+
+    return 1
+
+
+class QueryStats:
+    """
+    Aggregated timings of a slow query shape
+    """
+    def __init__(self, operation, shape):
+        self.operation = operation
+        self.shape = shape
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_count = 0
+        self.explain = None
+        self.explaining = False
+
+
+    def to_dict(self):
+        return {
+            "operation": self.operation,
+            "shape": self.shape,
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3),
+            "max_ms": round(self.max_ms, 3),
+            "last_count": self.last_count,
+            "explain": self.explain,
+        }
+
+
+class SlowQueryLog:
+    """
+    Registry of the operations slower than the configured threshold
+    """
+    _lock = Lock()
+    _stats = {}
+    _explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    @classmethod
+    def record(self, operation, query, duration_ms, count, explain):
+        """
+        Log a slow operation and capture the explain of the slowest shapes
+
+        :param operation: the name of the operation
+        :param query: the filter of the operation
+        :param duration_ms: the duration of the operation in milliseconds
+        :param count: the number of documents returned or affected
+        :param explain: callable returning the explain output of the filter
+        """
+        shape = query_shape(query)
+        key = operation + json.dumps(shape, sort_keys=True)
+
+        logger.warning(
+            "Slow query %s shape=%s duration_ms=%.3f count=%s",
+            operation, json.dumps(shape, sort_keys=True), duration_ms, count,
+        )
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(operation, shape)
+
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.last_count = count
+
+            needs_explain = (
+                explain is not None
+                and stats.explain is None
+                and not stats.explaining
+                and stats in self._slowest(settings.SLOW_QUERY_EXPLAIN_TOP)
+            )
+            if needs_explain:
+                stats.explaining = True
+
+        if needs_explain:
+            self._explainer.submit(copy_context().run, self._explain, stats, explain)
+
+
+    @classmethod
+    def _explain(self, stats, explain):
+        """
+        Capture the explain of a shape off the request path, in the context of the slow request
+        """
+        try:
+            result = explain()
+        except Exception as error:
+            result = {"error": str(error)}
+
+        with self._lock:
+            stats.explain = result
+            stats.explaining = False
+
+
+    @classmethod
+    def _slowest(self, limit):
+        return sorted(self._stats.values(), key=lambda stats: stats.max_ms, reverse=True)[:limit]
+
+
+    @classmethod
+    def top(self, limit):
+        """
+        Return the slowest query shapes
+
+        :param limit: the number of shapes to return
+        """
+        with self._lock:
+            return [stats.to_dict() for stats in self._slowest(limit)]
+
+
+def profiled(method):
+    """
+    Decorator to trace and time a model operation, recording it when above the slow query threshold
+
+    :param method: the model method to profile
+    """
+    @wraps(method)
+    def wrapper(cls, *args):
+        with Tracer.span(f"{cls.__name__}.{method.__name__}"):
+            start = perf_counter()
+            result = method(cls, *args)
+            duration_ms = (perf_counter() - start) * 1000
+
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            query = args[0] if args else {}
+            projection = args[1] if len(args) > 1 and method.__name__.startswith("find") else None
+            SlowQueryLog.record(
+                f"{cls.__name__}.{method.__name__}",
+                query,
+                duration_ms,
+                result_count(result),
+                None if method.__name__ == "insert_one" else lambda: cls.explain(query, projection),
+            )
+
+        return result
+
+    return wrapper
@@ -0,0 +1,137 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from bson import json_util
+from bson.timestamp import Timestamp
+from pymongo import ReadPreference
+
+from settings import settings
+
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+CAUSAL_TOKEN_HEADER = "x-causal-token"
+
+
+causal_state = ContextVar("causal_state", default=None)
+
+
+def read_preference(name):
+    """
+    Return the read preference matching its name
+
+    :param name: the name of the read preference, None for the client default
+    """
+    if name is None:
+        return None
+
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference: {name}")
+
+    return READ_PREFERENCES[name]
+
+
+def encode_token(session):
+    """
+    Encode the operation and cluster times of a session as a header value
+
+    :param session: the session used by the write
+    """
+    times = {"operationTime": session.operation_time, "clusterTime": session.cluster_time}
+    return urlsafe_b64encode(json_util.dumps(times).encode()).decode()
+
+
+def decode_token(token):
+    """
+    Decode a causal token sent by the client
+
+    :param token: the header value
+    :return: the operation and cluster times, or None if the token is invalid
+    """
+    try:
+        times = json_util.loads(urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError, KeyError):
+        return None
+
+    if not isinstance(times, Mapping):
+        return None
+
+    operation_time = times.get("operationTime")
+    cluster_time = times.get("clusterTime")
+
+    if not isinstance(operation_time, Timestamp):
+        return None
+
+    if not isinstance(cluster_time, Mapping) or not isinstance(cluster_time.get("clusterTime"), Timestamp):
+        return None
+
+    return times
+
+
+@contextmanager
+def causal_session(client, write):
+    """
+    Open a causally consistent session when the request carries or expects a causal token
+
+    Reads only need a session to wait for the times of a previous write, while writes
+    always use one so their times can be returned to the client.
+
+    :param client: the MongoDB client
+    :param write: whether the operation is a write
+    """
+    state = causal_state.get()
+
+    if state is None or not settings.MONGO_CAUSAL_CONSISTENCY or not (write or state["token"]):
+        yield None
+        return
+
+    with client.start_session(causal_consistency=True) as session:
+        if state["token"]:
+            session.advance_cluster_time(state["token"]["clusterTime"])
+            session.advance_operation_time(state["token"]["operationTime"])
+
+        yield session
+
+        if write and session.operation_time is not None:
+            state["outgoing"] = encode_token(session)
+
+
+class CausalConsistencyMiddleware:
+    """
+    ASGI middleware reading the causal token of the request and returning the one of its writes
+    """
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = None
+        for key, value in scope["headers"]:
+            if key == CAUSAL_TOKEN_HEADER.encode():
+                token = decode_token(value.decode("latin-1"))
+
+        state = {"token": token, "outgoing": None}
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and state["outgoing"]:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (CAUSAL_TOKEN_HEADER.encode(), state["outgoing"].encode()),
+                ]
+            await send(message)
+
+        reset = causal_state.set(state)
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            causal_state.reset(reset)
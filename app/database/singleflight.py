@@ -0,0 +1,98 @@
+import json
+
+from copy import deepcopy
+from functools import wraps
+from threading import Event, Lock
+
+from services.metrics import Metrics
+from services.tenancy import current_tenant
+
+from .sessions import causal_state
+
+
+class Call:
+    """
+    A query in flight shared by every caller with the same key
+    """
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical reads into a single database query
+    """
+    _lock = Lock()
+    _calls = {}
+
+    @classmethod
+    def key(self, name, *args):
+        """
+        Build the key identifying a read by its name, query and projection
+
+        :param name: the name of the read method
+        :param args: the query and projection of the read
+        """
+        return name + json.dumps(args, sort_keys=True, default=str)
+
+
+    @classmethod
+    def do(self, key, function, *args):
+        """
+        Run the function once for all concurrent callers with the same key
+
+        :param key: the key identifying the read
+        :param function: the function running the read
+        :param args: the arguments of the function
+        :return: the result, copied for each caller when it was shared
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            Metrics.increment("users.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return deepcopy(call.result)
+
+        try:
+            call.result = function(*args)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.followers > 0
+            call.done.set()
+
+        return deepcopy(call.result) if shared else call.result
+
+
+def coalesce(method):
+    """
+    Decorator to share one in-flight query between concurrent identical reads
+
+    Reads waiting for a causal token are not shared, as they must observe the client's own writes.
+
+    :param method: the read method to coalesce
+    """
+    @wraps(method)
+    def wrapper(cls, *args):
+        state = causal_state.get()
+        if state is not None and state["token"]:
+            return method(cls, *args)
+
+        key = SingleFlight.key(f"{current_tenant.get()}:{cls.__name__}.{method.__name__}", *args)
+        return SingleFlight.do(key, method, cls, *args)
+
+    return wrapper
@@ -0,0 +1,233 @@
+from abc import ABC, abstractmethod
+
+from pymongo import ReturnDocument
+
+from settings import settings
+
+from services.tenancy import current_tenant
+
+from .tenancy import TenantRegistry
+from .sessions import causal_session, read_preference
+
+
+class Storage(ABC):
+    """
+    Interface of a collection storage used by the models
+    """
+
+    @abstractmethod
+    def find_one(self, query, projection=None, read_preference=None):
+        """
+        Find the first document matching the query
+
+        :param query: the query to match
+        :param projection: the fields to include or exclude
+        :param read_preference: the name of the read preference, None for the primary
+        """
+        pass
+
+
+    @abstractmethod
+    def find(self, query, projection=None, read_preference=None):
+        """
+        Find all documents matching the query
+
+        :param query: the query to match
+        :param projection: the fields to include or exclude
+        :param read_preference: the name of the read preference, None for the primary
+        :return: the list of documents found
+        """
+        pass
+
+
+    @abstractmethod
+    def insert_one(self, document):
+        """
+        Insert a document
+
+        :param document: the document to insert
+        """
+        pass
+
+
+    @abstractmethod
+    def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE):
+        """
+        Update the first document matching the query and return it
+
+        :param query: the query to match
+        :param update: the update operators to apply
+        :param return_document: whether to return the document before or after the update
+        """
+        pass
+
+
+    @abstractmethod
+    def update_one(self, query, update):
+        """
+        Update the first document matching the query
+
+        :param query: the query to match
+        :param update: the update operators to apply
+        """
+        pass
+
+
+    @abstractmethod
+    def update_many(self, query, update):
+        """
+        Update all documents matching the query
+
+        :param query: the query to match
+        :param update: the update operators to apply
+        """
+        pass
+
+
+    @abstractmethod
+    def delete_one(self, query):
+        """
+        Delete the first document matching the query
+
+        :param query: the query to match
+        """
+        pass
+
+
+    @abstractmethod
+    def create_index(self, field, unique=False, expire_after_seconds=None):
+        """
+        Create an index on a field
+
+        :param field: the field to index
+        :param unique: whether the values of the field must be unique
+        :param expire_after_seconds: the seconds after the datetime in the field when documents expire
+        """
+        pass
+
+
+    @abstractmethod
+    def explain(self, query, projection=None):
+        """
+        Explain how the query is executed
+
+        :param query: the query to explain
+        :param projection: the fields to include or exclude
+        :return: the winning plan and execution stats of the query
+        """
+        pass
+
+
+class MongoStorage(Storage):
+    """
+    Storage backed by a MongoDB collection in the database of the current tenant
+    """
+    def __init__(self, name):
+        """
+        :param name: the name of the collection
+        """
+        self.name = name
+
+
+    @property
+    def collection(self):
+        return TenantRegistry.get_database()[self.name]
+
+
+    def _reader(self, name):
+        collection = self.collection
+        preference = read_preference(name)
+        if preference is None:
+            return collection
+        return collection.with_options(read_preference=preference)
+
+
+    def find_one(self, query, projection=None, read_preference=None):
+        collection = self._reader(read_preference)
+        with causal_session(collection.database.client, write=False) as session:
+            return collection.find_one(query, projection, session=session)
+
+
+    def find(self, query, projection=None, read_preference=None):
+        collection = self._reader(read_preference)
+        with causal_session(collection.database.client, write=False) as session:
+            return list(collection.find(query, projection, session=session))
+
+
+    def insert_one(self, document):
+        collection = self.collection
+        with causal_session(collection.database.client, write=True) as session:
+            return collection.insert_one(document, session=session)
+
+
+    def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE):
+        collection = self.collection
+        with causal_session(collection.database.client, write=True) as session:
+            return collection.find_one_and_update(query, update, return_document=return_document, session=session)
+
+
+    def update_one(self, query, update):
+        collection = self.collection
+        with causal_session(collection.database.client, write=True) as session:
+            return collection.update_one(query, update, session=session)
+
+
+    def update_many(self, query, update):
+        collection = self.collection
+        with causal_session(collection.database.client, write=True) as session:
+            return collection.update_many(query, update, session=session)
+
+
+    def delete_one(self, query):
+        collection = self.collection
+        with causal_session(collection.database.client, write=True) as session:
+            return collection.delete_one(query, session=session)
+
+
+    def create_index(self, field, unique=False, expire_after_seconds=None):
+        options = {"unique": unique}
+        if expire_after_seconds is not None:
+            options["expireAfterSeconds"] = expire_after_seconds
+        return self.collection.create_index(field, **options)
+
+
+    def explain(self, query, projection=None):
+        explain = self.collection.find(query, projection).explain()
+        stats = explain.get("executionStats", {})
+
+        return {
+            "winning_plan": explain.get("queryPlanner", {}).get("winningPlan"),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "returned": stats.get("nReturned"),
+        }
+
+
+_storages = {}
+
+
+def get_storage(name):
+    """
+    Return the storage of a collection using the backend configured in the settings
+
+    The Mongo storage resolves the tenant database on every operation, while the memory
+    storage keeps a separate store per tenant.
+
+    :param name: the name of the collection
+    """
+    key = (current_tenant.get(), name) if settings.STORAGE_BACKEND == "memory" else name
+    storage = _storages.get(key)
+
+    if storage is None:
+        if settings.STORAGE_BACKEND == "memory":
+            from .memory import MemoryStorage
+            indexes = [field.strip() for field in settings.MEMORY_STORAGE_INDEXES.split(",") if field.strip()]
+            storage = MemoryStorage(indexes=indexes)
+        elif settings.STORAGE_BACKEND == "mongo":
+            storage = MongoStorage(name)
+        else:
+            raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+        storage = _storages.setdefault(key, storage)
+
+    return storage
@@ -0,0 +1,187 @@
+import os
+
+from collections import OrderedDict
+from threading import RLock
+from time import monotonic
+
+from pymongo import MongoClient
+
+from settings import settings
+
+from services.metrics import Metrics
+from services.tenancy import current_tenant, UnknownTenantError
+
+from .base import BaseDB, CommandTracer
+from .collections import Collections
+
+
+class TenantHandle:
+    """
+    The database of a tenant and the client it was opened with
+    """
+    def __init__(self, database, client=None):
+        """
+        :param database: the database of the tenant
+        :param client: the dedicated client of the tenant, None when sharing the default one
+        """
+        self.database = database
+        self.client = client
+        self.last_used = monotonic()
+
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+
+class TenantRegistry:
+    """
+    Bounded LRU cache of the tenant databases, evicting the least recently used and idle ones
+
+    The clients of evicted tenants are closed after TENANT_CLOSE_DELAY_SECONDS, so operations
+    still holding their database handle can finish.
+    """
+    _lock = RLock()
+    _handles = OrderedDict()
+    _retired = []
+
+    @classmethod
+    def get_database(self, company_id=None):
+        """
+        Return the database of a tenant, defaulting to the tenant of the current request
+
+        :param company_id: the id of the company
+        :raises UnknownTenantError: if no company exists with the id
+        """
+        company_id = company_id or current_tenant.get()
+
+        if company_id is None:
+            return BaseDB.get_database()
+
+        with self._lock:
+            self._evict_idle()
+            self._close_retired()
+
+            handle = self._handles.get(company_id)
+            if handle is not None:
+                self._handles.move_to_end(company_id)
+                handle.last_used = monotonic()
+                Metrics.increment("tenants.hits")
+                Metrics.increment(f"tenant.{company_id}.operations")
+                return handle.database
+
+        Metrics.increment("tenants.misses")
+        opened = self._open(company_id)
+
+        with self._lock:
+            handle = self._handles.get(company_id)
+
+            if handle is None:
+                handle = self._handles[company_id] = opened
+                while len(self._handles) > settings.TENANT_CACHE_SIZE:
+                    self._evict(next(iter(self._handles)))
+            else:
+                opened.close()
+                self._handles.move_to_end(company_id)
+                handle.last_used = monotonic()
+
+            Metrics.increment(f"tenant.{company_id}.operations")
+            Metrics.set_gauge("tenants.cached", len(self._handles))
+            return handle.database
+
+
+    @classmethod
+    def _open(self, company_id):
+        """
+        Open the database of a tenant from its company document, outside of the registry lock
+
+        :raises UnknownTenantError: if no company exists with the id
+        """
+        company = BaseDB.get_database()[Collections.COMPANIES].find_one(
+            {"id": company_id},
+            {"_id": 0, "database": 1, "mongo_url": 1},
+        )
+
+        if company is None:
+            raise UnknownTenantError(company_id)
+
+        name = company.get("database") or settings.TENANT_DATABASE_TEMPLATE.format(
+            database=settings.DATABASE_ENVIRONMENT,
+            company_id=company_id,
+        )
+
+        if company.get("mongo_url"):
+            options = {"event_listeners": [CommandTracer()]} if settings.TRACING_ENABLED else {}
+            client = MongoClient(company["mongo_url"], maxPoolSize=settings.TENANT_MAX_POOL_SIZE, **options)
+            return TenantHandle(client[name], client)
+
+        return TenantHandle(BaseDB.get_connection()[name])
+
+
+    @classmethod
+    def _evict(self, company_id):
+        """
+        Remove a tenant from the cache and retire its client
+        """
+        handle = self._handles.pop(company_id)
+        if handle.client is not None:
+            self._retired.append((monotonic() + settings.TENANT_CLOSE_DELAY_SECONDS, handle))
+
+        Metrics.remove(f"tenant.{company_id}.operations")
+        Metrics.increment("tenants.evicted")
+        Metrics.set_gauge("tenants.cached", len(self._handles))
+
+
+    @classmethod
+    def _evict_idle(self):
+        """
+        Evict the tenants not used for longer than the idle timeout, oldest first
+        """
+        deadline = monotonic() - settings.TENANT_IDLE_SECONDS
+
+        while self._handles:
+            company_id, handle = next(iter(self._handles.items()))
+            if handle.last_used > deadline:
+                break
+            self._evict(company_id)
+
+
+    @classmethod
+    def _close_retired(self, force=False):
+        """
+        Close the clients of the evicted tenants whose delay has passed
+        """
+        now = monotonic()
+        remaining = []
+
+        for deadline, handle in self._retired:
+            if force or deadline <= now:
+                handle.close()
+            else:
+                remaining.append((deadline, handle))
+
+        self._retired[:] = remaining
+
+
+    @classmethod
+    def close(self):
+        """
+        Close the clients of every cached and retired tenant
+        """
+        with self._lock:
+            while self._handles:
+                self._evict(next(iter(self._handles)))
+            self._close_retired(force=True)
+
+
+    @classmethod
+    def reset_after_fork(self):
+        """
+        Drop the tenants inherited from the parent process without closing their clients
+        """
+        self._lock = RLock()
+        self._handles = OrderedDict()
+        self._retired = []
+
+
+os.register_at_fork(after_in_child=TenantRegistry.reset_after_fork)
@@ -0,0 +1 @@
+from .routers import debug_router, memory_router
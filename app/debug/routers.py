@@ -0,0 +1,201 @@
+import os
+
+from fastapi import APIRouter, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.security import AuthenticatedRoute
+from services.monitoring import LoopLagMonitor
+from services.memory import MemoryProfiler
+
+from database import SlowQueryLog
+
+
+debug_router = APIRouter(prefix="/debug", tags=["Debug"], route_class=AuthenticatedRoute)
+memory_router = APIRouter(prefix="/debug/memory", tags=["Debug"], route_class=AuthenticatedRoute)
+
+
+@debug_router.get("/slow-queries", status_code=status.HTTP_200_OK, summary="Endpoint to get the slowest query shapes.")
+async def slow_queries(limit: int = Query(10, ge=1, le=100)):
+    """
+    # Slow Queries
+
+    ## Query Parameters
+    - **limit**: The number of query shapes to return.
+
+    ## Responses
+    - **200 OK**: Returns the slowest query shapes with their timings and explain output.
+    """
+    return JSONResponse(status_code=status.HTTP_200_OK, content=jsonable_encoder(SlowQueryLog.top(limit)))
+
+
+@debug_router.get("/blocking", status_code=status.HTTP_200_OK, summary="Endpoint to get the calls that blocked the event loop.")
+async def blocking_calls():
+    """
+    # Blocking Calls
+
+    ## Responses
+    - **200 OK**: Returns the most recent event loop blocks with the request and stack that caused them.
+    """
+    return JSONResponse(status_code=status.HTTP_200_OK, content=jsonable_encoder(list(LoopLagMonitor.incidents)))
+
+
+def worker_response(content, status_code=status.HTTP_200_OK):
+    """
+    Build the response of a memory endpoint, tagged with the pid of the worker that answered
+
+    :param content: the content of the response
+    :param status_code: the status code of the response
+    """
+    return JSONResponse(status_code=status_code, content={"pid": os.getpid(), **content})
+
+
+def misdirected(pid):
+    """
+    Return a 421 response when the request reached another worker than the requested one
+
+    :param pid: the pid of the requested worker, None for any worker
+    """
+    if pid is None or pid == os.getpid():
+        return None
+
+    return worker_response({"message": f"Request reached worker {os.getpid()}, retry to reach worker {pid}"}, status.HTTP_421_MISDIRECTED_REQUEST)
+
+
+@memory_router.post("/start", status_code=status.HTTP_200_OK, summary="Endpoint to start tracing the memory allocations.")
+def start_memory_tracing(frames: int = Query(1, ge=1, le=50), pid: int = Query(None)):
+    """
+    # Start Memory Tracing
+
+    ## Query Parameters
+    - **frames**: The number of frames kept per allocation.
+    - **pid**: The worker that must answer, any worker when not given.
+
+    ## Responses
+    - **200 OK**: Returns the memory tracing status of the worker.
+    - **421 Misdirected Request**: If the request reached another worker than **pid**.
+    """
+    response = misdirected(pid)
+    if response is not None:
+        return response
+
+    MemoryProfiler.start(frames)
+
+    return worker_response(MemoryProfiler.status())
+
+
+@memory_router.post("/stop", status_code=status.HTTP_200_OK, summary="Endpoint to stop tracing the memory allocations.")
+def stop_memory_tracing(pid: int = Query(None)):
+    """
+    # Stop Memory Tracing
+
+    ## Query Parameters
+    - **pid**: The worker that must answer, any worker when not given.
+
+    ## Responses
+    - **200 OK**: Returns the memory tracing status of the worker.
+    - **421 Misdirected Request**: If the request reached another worker than **pid**.
+    """
+    response = misdirected(pid)
+    if response is not None:
+        return response
+
+    MemoryProfiler.stop()
+
+    return worker_response(MemoryProfiler.status())
+
+
+@memory_router.get("/top", status_code=status.HTTP_200_OK, summary="Endpoint to get the top allocation sites.")
+def memory_top(limit: int = Query(20, ge=1, le=200), pid: int = Query(None)):
+    """
+    # Top Allocation Sites
+
+    ## Query Parameters
+    - **limit**: The number of allocation sites to return.
+    - **pid**: The worker that must answer, any worker when not given.
+
+    ## Responses
+    - **200 OK**: Returns the allocation sites holding the most memory in the worker.
+    - **409 Conflict**: If memory tracing is not started in the worker.
+    - **421 Misdirected Request**: If the request reached another worker than **pid**.
+    """
+    response = misdirected(pid)
+    if response is not None:
+        return response
+
+    try:
+        sites = MemoryProfiler.top(limit)
+    except RuntimeError as error:
+        return worker_response({"message": str(error)}, status.HTTP_409_CONFLICT)
+
+    return worker_response({"sites": sites})
+
+
+@memory_router.post("/snapshot", status_code=status.HTTP_200_OK, summary="Endpoint to take the baseline memory snapshot.")
+def memory_snapshot(pid: int = Query(None)):
+    """
+    # Memory Snapshot
+
+    ## Query Parameters
+    - **pid**: The worker that must answer, any worker when not given.
+
+    ## Responses
+    - **200 OK**: Returns the memory tracing status of the worker once the baseline is taken.
+    - **409 Conflict**: If memory tracing is not started in the worker.
+    - **421 Misdirected Request**: If the request reached another worker than **pid**.
+    """
+    response = misdirected(pid)
+    if response is not None:
+        return response
+
+    try:
+        MemoryProfiler.take_baseline()
+    except RuntimeError as error:
+        return worker_response({"message": str(error)}, status.HTTP_409_CONFLICT)
+
+    return worker_response(MemoryProfiler.status())
+
+
+@memory_router.get("/diff", status_code=status.HTTP_200_OK, summary="Endpoint to compare the memory with the baseline snapshot.")
+def memory_diff(limit: int = Query(20, ge=1, le=200), pid: int = Query(None)):
+    """
+    # Memory Diff
+
+    ## Query Parameters
+    - **limit**: The number of allocation sites to return.
+    - **pid**: The worker that must answer, any worker when not given.
+
+    ## Responses
+    - **200 OK**: Returns the allocation sites of the worker that grew the most since its baseline snapshot.
+    - **409 Conflict**: If memory tracing is not started or no baseline was taken in the worker.
+    - **421 Misdirected Request**: If the request reached another worker than **pid**.
+    """
+    response = misdirected(pid)
+    if response is not None:
+        return response
+
+    try:
+        sites = MemoryProfiler.diff(limit)
+    except RuntimeError as error:
+        return worker_response({"message": str(error)}, status.HTTP_409_CONFLICT)
+
+    return worker_response({"sites": sites})
+
+
+@memory_router.get("/routes", status_code=status.HTTP_200_OK, summary="Endpoint to get the memory peaks per route.")
+def memory_routes(pid: int = Query(None)):
+    """
+    # Memory Peaks per Route
+
+    ## Query Parameters
+    - **pid**: The worker that must answer, any worker when not given.
+
+    ## Responses
+    - **200 OK**: Returns the highest memory peak of the routes whose requests went over the threshold in the worker.
+    - **421 Misdirected Request**: If the request reached another worker than **pid**.
+    """
+    response = misdirected(pid)
+    if response is not None:
+        return response
+
+    return worker_response({"routes": MemoryProfiler.route_peaks()})
@@ -0,0 +1 @@
+from .routing import IdempotentRoute
\ No newline at end of file
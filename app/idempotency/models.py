@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from settings import settings
+
+from services.tenancy import current_tenant
+
+from database import get_storage, Collections
+
+
+class IdempotencyKeys:
+    """
+    Class to represent the stored results of idempotent requests
+    """
+    indexed = set()
+
+    @classmethod
+    def storage(self):
+        """
+        Method to get the storage of the idempotency keys collection, creating its indexes once per tenant database
+
+        :return: The storage configured in the settings
+        """
+        storage = get_storage(Collections.IDEMPOTENCY_KEYS)
+        tenant = current_tenant.get()
+
+        if tenant not in self.indexed:
+            storage.create_index("key", unique=True)
+            storage.create_index("created_at", expire_after_seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            self.indexed.add(tenant)
+
+        return storage
+
+
+    @classmethod
+    def claim(self, key, fingerprint, owner):
+        """
+        Method to reserve a key before running the request
+
+        An in-progress claim whose lock expired is taken over only if it is still the claim that
+        was read, so concurrent retries cannot both take it over.
+
+        :param key: The key of the request
+        :type key: str
+
+        :param fingerprint: The hash of the request body
+        :type fingerprint: str
+
+        :param owner: The id of the claim, required to complete or release it
+        :type owner: str
+
+        :return: None if the key was reserved, otherwise the record already stored
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+
+            try:
+                self.storage().insert_one({
+                    "key": key,
+                    "owner": owner,
+                    "fingerprint": fingerprint,
+                    "status": "in_progress",
+                    "created_at": now,
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+
+            existing = self.storage().find_one({"key": key}, {"_id": 0})
+
+            if existing is None:
+                continue
+
+            locked_until = existing["created_at"] + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+            if locked_until.tzinfo is None:
+                locked_until = locked_until.replace(tzinfo=timezone.utc)
+
+            if existing["status"] != "in_progress" or locked_until >= now:
+                return existing
+
+            taken = self.storage().find_one_and_update(
+                {"key": key, "status": "in_progress", "created_at": existing["created_at"]},
+                {"$set": {"owner": owner, "fingerprint": fingerprint, "created_at": now}},
+            )
+
+            if taken is not None:
+                return None
+
+
+    @classmethod
+    def complete(self, key, owner, status_code, body, media_type):
+        """
+        Method to store the response of a request, if its claim still owns the key
+
+        :param key: The key of the request
+        :type key: str
+
+        :param owner: The id of the claim
+        :type owner: str
+
+        :param status_code: The status code of the response
+        :type status_code: int
+
+        :param body: The body of the response
+        :type body: bytes
+
+        :param media_type: The media type of the response
+        :type media_type: str
+
+        :return: The result of the update
+        """
+        return self.storage().update_one(
+            {"key": key, "owner": owner, "status": "in_progress"},
+            {
+                "$set": {
+                    "status": "completed",
+                    "status_code": status_code,
+                    "body": body,
+                    "media_type": media_type,
+                }
+            },
+        )
+
+
+    @classmethod
+    def release(self, key, owner):
+        """
+        Method to release a key whose request failed so it can be retried, if its claim still owns the key
+
+        :param key: The key of the request
+        :type key: str
+
+        :param owner: The id of the claim
+        :type owner: str
+        """
+        return self.storage().delete_one({"key": key, "owner": owner, "status": "in_progress"})
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from settings import settings
+
+from services.metrics import Metrics
+from services.security import Authorize, AuthenticatedRoute
+from services.tenancy import current_tenant, use_tenant
+
+from idempotency.models import IdempotencyKeys
+
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ResponseCache:
+    """
+    In-memory LRU of the completed idempotent responses, in front of the collection
+    """
+    _lock = Lock()
+    _records = OrderedDict()
+
+    @classmethod
+    def get(self, key):
+        """
+        Return the record of a key if it is cached and not expired
+
+        :param key: the key of the request
+        """
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is None:
+                return None
+
+            expires_at, record = entry
+            if expires_at < monotonic():
+                del self._records[key]
+                return None
+
+            self._records.move_to_end(key)
+            return record
+
+
+    @classmethod
+    def set(self, key, record):
+        """
+        Cache the record of a completed request
+
+        :param key: the key of the request
+        :param record: the stored response
+        """
+        with self._lock:
+            self._records[key] = (monotonic() + settings.IDEMPOTENCY_TTL_SECONDS, record)
+            self._records.move_to_end(key)
+            while len(self._records) > settings.IDEMPOTENCY_CACHE_SIZE:
+                self._records.popitem(last=False)
+
+
+def replay(record):
+    """
+    Build the response of a completed request from its record
+
+    :param record: the stored response
+    """
+    Metrics.increment("idempotency.replayed")
+    return Response(
+        content=record["body"],
+        status_code=record["status_code"],
+        media_type=record["media_type"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+class IdempotentRoute(AuthenticatedRoute):
+    """
+    A route returning the stored response when a mutating request is retried with the same Idempotency-Key
+
+    The stored response is returned before the body is validated and the endpoint runs, so a retry
+    repeats neither the validators nor the endpoint work. The token is verified and the tenant selected
+    before the key is claimed, and keys are scoped by the tenant, user, method and path of the request.
+
+    :param AuthenticatedRoute: the authenticated route
+    """
+    def get_route_handler(self):
+        handler = super(IdempotentRoute, self).get_route_handler()
+
+        if not self.methods & MUTATING_METHODS:
+            return handler
+
+        async def idempotent_handler(request):
+            idempotency_key = request.headers.get("idempotency-key")
+            scheme, _, token = request.headers.get("authorization", "").partition(" ")
+
+            if not idempotency_key or scheme.lower() != "bearer" or not token:
+                return await handler(request)
+
+            try:
+                context = Authorize.decode_token(token)
+            except HTTPException:
+                return await handler(request)
+
+            use_tenant(context.get("company_id"))
+
+            key = sha256(
+                "\n".join([
+                    current_tenant.get() or "",
+                    str(context.get("user_id", "")),
+                    request.method,
+                    request.url.path,
+                    idempotency_key,
+                ]).encode()
+            ).hexdigest()
+            fingerprint = sha256(await request.body()).hexdigest()
+
+            record = ResponseCache.get(key)
+
+            if record is None:
+                owner = uuid4().hex
+                record = await run_in_threadpool(IdempotencyKeys.claim, key, fingerprint, owner)
+
+            if record is not None:
+                if record["fingerprint"] != fingerprint:
+                    return JSONResponse(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        content={"message": "Idempotency-Key was already used with a different request body"},
+                    )
+
+                if record["status"] != "completed":
+                    Metrics.increment("idempotency.conflicts")
+                    return JSONResponse(
+                        status_code=status.HTTP_409_CONFLICT,
+                        content={"message": "A request with this Idempotency-Key is still in progress"},
+                        headers={"Retry-After": "1"},
+                    )
+
+                ResponseCache.set(key, record)
+                return replay(record)
+
+            try:
+                response = await handler(request)
+            except BaseException:
+                await run_in_threadpool(IdempotencyKeys.release, key, owner)
+                raise
+
+            if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR or not hasattr(response, "body"):
+                await run_in_threadpool(IdempotencyKeys.release, key, owner)
+                return response
+
+            result = await run_in_threadpool(IdempotencyKeys.complete, key, owner, response.status_code, response.body, response.media_type)
+
+            if not result.matched_count:
+                return response
+
+            ResponseCache.set(key, {
+                "fingerprint": fingerprint,
+                "status": "completed",
+                "status_code": response.status_code,
+                "body": response.body,
+                "media_type": response.media_type,
+            })
+
+            return response
+
+        return idempotent_handler
@@ -1,12 +1,23 @@
-from fastapi import FastAPI, Response, status
+from fastapi import Depends, FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from version import __version__
 
 from settings import settings
 
+from services.metrics import Metrics
+from services.security import Authorize
+from services.tenancy import UnknownTenantError
+from services.monitoring import loop_monitor
+from services.tracing import TracingMiddleware
+from services.memory import MemoryPeakMiddleware
+
+from database import BaseConnection, CausalConsistencyMiddleware, TenantRegistry
+
 from authentication.routers import auth_router
 from users.routers import user_router
+from debug.routers import debug_router, memory_router
 
 
 app = FastAPI(
@@ -25,14 +36,37 @@ app = FastAPI(
     },
 )
 
+app.add_event_handler("shutdown", TenantRegistry.close)
+app.add_event_handler("shutdown", BaseConnection.close_connection)
+
+if settings.LOOP_MONITOR_ENABLED:
+    app.add_event_handler("startup", loop_monitor.start)
+    app.add_event_handler("shutdown", loop_monitor.stop)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Causal-Token", "X-Trace-Id"],
 )
 
+app.add_middleware(CausalConsistencyMiddleware)
+
+if settings.MEMORY_PROFILING_ENABLED:
+    app.add_middleware(MemoryPeakMiddleware)
+
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(UnknownTenantError)
+def unknown_tenant(request, error):
+    """
+    Reject the requests addressed to a company that does not exist
+    """
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Company not found."})
+
 @app.get("/health_check")
 def health_check():
     """
@@ -40,5 +74,26 @@ def health_check():
     """
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+@app.get("/metrics")
+def metrics(context: dict = Depends(Authorize.auth_wrapper)):
+    """
+    Return the instrumentation counters and gauges of the application
+
+    The per-tenant counters are limited to the company of the caller.
+    """
+    snapshot = Metrics.snapshot()
+    own = f"tenant.{context.get('company_id')}."
+    snapshot["counters"] = {
+        name: value for name, value in snapshot["counters"].items()
+        if not name.startswith("tenant.") or name.startswith(own)
+    }
+    return snapshot
+
 app.include_router(auth_router)
-app.include_router(user_router)
\ No newline at end of file
+app.include_router(user_router)
+
+if settings.DEBUG:
+    app.include_router(debug_router)
+
+if settings.MEMORY_PROFILING_ENABLED:
+    app.include_router(memory_router)
@@ -1 +1,4 @@
-from .security import Authorize, verify_password, set_password_hash, AuthenticatedRoute
\ No newline at end of file
+from .security import Authorize, verify_password, set_password_hash, AuthenticatedRoute
+from .metrics import Metrics
+from .throttling import LoginThrottle
+from .tenancy import current_tenant, use_tenant, UnknownTenantError
\ No newline at end of file
@@ -0,0 +1,183 @@
+import tracemalloc
+
+from threading import Lock
+
+from settings import settings
+
+from services.metrics import Metrics
+
+
+IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def statistic_to_dict(statistic):
+    frame = statistic.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(statistic.size / 1024, 3),
+        "count": statistic.count,
+    }
+
+
+def difference_to_dict(difference):
+    frame = difference.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(difference.size / 1024, 3),
+        "size_diff_kb": round(difference.size_diff / 1024, 3),
+        "count_diff": difference.count_diff,
+    }
+
+
+class MemoryProfiler:
+    """
+    On-demand allocation tracing, only costing anything while it is started
+    """
+    _lock = Lock()
+    _baseline = None
+    _route_peaks = {}
+
+    @classmethod
+    def start(self, frames=1):
+        """
+        Start tracing the allocations
+
+        :param frames: the number of frames kept per allocation
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = None
+            self._route_peaks = {}
+
+
+    @classmethod
+    def stop(self):
+        """
+        Stop tracing the allocations and drop the snapshots
+        """
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+
+
+    @classmethod
+    def status(self):
+        """
+        Return whether tracing is active and the traced memory
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "current_kb": round(current / 1024, 3),
+            "peak_kb": round(peak / 1024, 3),
+            "baseline": self._baseline is not None,
+        }
+
+
+    @classmethod
+    def _snapshot(self):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not started")
+        return tracemalloc.take_snapshot().filter_traces(IGNORED)
+
+
+    @classmethod
+    def top(self, limit):
+        """
+        Return the allocation sites holding the most memory
+
+        :param limit: the number of sites to return
+        """
+        return [statistic_to_dict(statistic) for statistic in self._snapshot().statistics("lineno")[:limit]]
+
+
+    @classmethod
+    def take_baseline(self):
+        """
+        Take the snapshot the next diffs are compared to
+        """
+        snapshot = self._snapshot()
+        with self._lock:
+            self._baseline = snapshot
+
+
+    @classmethod
+    def diff(self, limit):
+        """
+        Return the allocation sites that grew the most since the baseline
+
+        :param limit: the number of sites to return
+        """
+        if self._baseline is None:
+            raise RuntimeError("No baseline snapshot was taken")
+
+        differences = self._snapshot().compare_to(self._baseline, "lineno")
+        return [difference_to_dict(difference) for difference in differences[:limit]]
+
+
+    @classmethod
+    def record_peak(self, route, peak):
+        """
+        Keep the highest memory peak of a route
+
+        :param route: the route of the request
+        :param peak: the memory allocated at the peak of the request, in bytes
+        """
+        with self._lock:
+            stats = self._route_peaks.setdefault(route, {"requests": 0, "peak_kb": 0.0})
+            stats["requests"] += 1
+            stats["peak_kb"] = max(stats["peak_kb"], round(peak / 1024, 3))
+
+
+    @classmethod
+    def route_peaks(self):
+        """
+        Return the peaks of the routes whose requests went over the threshold
+        """
+        with self._lock:
+            return dict(sorted(self._route_peaks.items(), key=lambda item: item[1]["peak_kb"], reverse=True))
+
+
+class MemoryPeakMiddleware:
+    """
+    ASGI middleware recording the memory peak of each request while tracing is started
+
+    The peak is process wide, so it is only reset when no other request is in flight and only
+    recorded for requests that ran alone. Overlapping requests are counted in memory.peaks_overlapped.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = []
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracemalloc.is_tracing():
+            return await self.app(scope, receive, send)
+
+        request = {"overlapped": bool(self.in_flight)}
+        for other in self.in_flight:
+            other["overlapped"] = True
+
+        if not self.in_flight:
+            tracemalloc.reset_peak()
+        self.in_flight.append(request)
+        start, _ = tracemalloc.get_traced_memory()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight.remove(request)
+
+            if request["overlapped"]:
+                Metrics.increment("memory.peaks_overlapped")
+            elif tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                if peak - start >= settings.MEMORY_PEAK_THRESHOLD_KB * 1024:
+                    route = scope.get("route")
+                    name = f"{scope['method']} {route.path}" if route is not None else "<unmatched>"
+                    MemoryProfiler.record_peak(name, peak - start)
@@ -0,0 +1,57 @@
+from threading import Lock
+
+
+class Metrics:
+    """
+    In-process registry of counters and gauges used for instrumentation
+    """
+    _lock = Lock()
+    _counters = {}
+    _gauges = {}
+
+    @classmethod
+    def increment(self, name, value=1):
+        """
+        Increment a counter
+
+        :param name: the name of the counter
+        :param value: the amount to increment
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+
+    @classmethod
+    def set_gauge(self, name, value):
+        """
+        Set the current value of a gauge
+
+        :param name: the name of the gauge
+        :param value: the value of the gauge
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+
+    @classmethod
+    def remove(self, name):
+        """
+        Remove a counter or gauge
+
+        :param name: the name of the counter or gauge
+        """
+        with self._lock:
+            self._counters.pop(name, None)
+            self._gauges.pop(name, None)
+
+
+    @classmethod
+    def snapshot(self):
+        """
+        Return a copy of all counters and gauges
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+            }
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+
+from collections import deque
+from datetime import datetime
+from time import monotonic
+
+from services.metrics import Metrics
+
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def blocked_route(frame):
+    """
+    Find the request being handled by walking the stack for an ASGI scope
+
+    :param frame: the innermost frame of the blocked thread
+    """
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            route = scope.get("route")
+            return {
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "route": getattr(route, "path", None),
+            }
+        frame = frame.f_back
+
+    return None
+
+
+class LoopLagMonitor:
+    """
+    Measure the event loop lag and capture the stack of the calls blocking it
+    """
+    incidents = deque(maxlen=50)
+
+    def __init__(self, interval_ms, threshold_ms):
+        """
+        :param interval_ms: the interval between two lag measurements
+        :param threshold_ms: the lag above which the loop is considered blocked
+        """
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.heartbeat = monotonic()
+        self.max_lag_ms = 0.0
+        self.task = None
+        self.watchdog = None
+        self.stopped = threading.Event()
+        self.loop_thread_id = None
+
+
+    async def measure(self):
+        """
+        Sleep for the interval and record how late the loop woke up
+        """
+        while True:
+            start = monotonic()
+            await asyncio.sleep(self.interval)
+            now = monotonic()
+            self.heartbeat = now
+
+            lag_ms = max(0.0, (now - start - self.interval) * 1000)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            Metrics.set_gauge("event_loop.lag_ms", round(lag_ms, 3))
+            Metrics.set_gauge("event_loop.lag_max_ms", round(self.max_lag_ms, 3))
+
+
+    def watch(self):
+        """
+        Capture the stack of the loop thread once per block longer than the threshold
+        """
+        reported = None
+
+        while not self.stopped.wait(self.interval):
+            heartbeat = self.heartbeat
+            blocked_for = monotonic() - heartbeat - self.interval
+
+            if blocked_for < self.threshold or reported == heartbeat:
+                continue
+
+            reported = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+
+            incident = {
+                "detected_at": datetime.now().isoformat(),
+                "blocked_ms": round(blocked_for * 1000, 3),
+                "request": blocked_route(frame),
+                "stack": traceback.format_stack(frame),
+            }
+            del frame
+
+            self.incidents.append(incident)
+            Metrics.increment("event_loop.blocked")
+            logger.warning(
+                "Event loop blocked for %.0f ms while handling %s\n%s",
+                incident["blocked_ms"], incident["request"], "".join(incident["stack"]),
+            )
+
+
+    def start(self):
+        """
+        Start measuring the lag of the running loop
+        """
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = monotonic()
+        self.stopped.clear()
+        self.task = asyncio.get_running_loop().create_task(self.measure())
+        self.watchdog = threading.Thread(target=self.watch, name="loop-lag-watchdog", daemon=True)
+        self.watchdog.start()
+
+
+    def stop(self):
+        """
+        Stop measuring the lag
+        """
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+loop_monitor = LoopLagMonitor(settings.LOOP_LAG_INTERVAL_MS, settings.LOOP_BLOCK_THRESHOLD_MS)
@@ -10,6 +10,12 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from settings import settings
 
+from services.tracing import Tracer
+from services.tenancy import use_tenant
+
+
+password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 
 def verify_password(plain_password, hashed_password):
     """
@@ -18,7 +24,6 @@ def verify_password(plain_password, hashed_password):
     :param plain_password: the password provided by the user
     :param hashed_password: the hashed password in the database
     """
-    password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     return password_context.verify(plain_password, hashed_password)
 
 
@@ -28,7 +33,6 @@ def set_password_hash(password):
 
     :param password: the password to be hashed
     """
-    password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     return password_context.hash(password)
 
 
@@ -72,7 +76,8 @@ class Authorize:
         :param token: the token to be decoded
         """
         try:
-            context = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            with Tracer.span("Authorize.decode_token"):
+                context = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
             return context
 
         except jwt.ExpiredSignatureError as error:
@@ -82,11 +87,15 @@ class Authorize:
         
 
     @classmethod
-    def auth_wrapper(self, auth: HTTPAuthorizationCredentials = Security(HTTPBearer())):
+    async def auth_wrapper(self, auth: HTTPAuthorizationCredentials = Security(HTTPBearer())):
         """
-        A wrapper to authenticate the user and decode the token
+        A wrapper to authenticate the user, decode the token and select the database of its company
+
+        It runs on the event loop so the tenant it sets is seen by the validators and the route.
         """
-        return self.decode_token(auth.credentials)
+        context = self.decode_token(auth.credentials)
+        use_tenant(context.get("company_id"))
+        return context
 
 
 class AuthenticatedRoute(APIRoute):
@@ -0,0 +1,27 @@
+import re
+
+from contextvars import ContextVar
+
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+current_tenant = ContextVar("current_tenant", default=None)
+
+
+class UnknownTenantError(LookupError):
+    """
+    Raised when a company id is malformed or no company exists with it
+    """
+
+
+def use_tenant(company_id):
+    """
+    Set the tenant whose database serves the current request
+
+    :param company_id: the id of the company, None for the default database
+    """
+    if company_id and (not isinstance(company_id, str) or not TENANT_ID_PATTERN.match(company_id)):
+        raise UnknownTenantError(company_id)
+
+    current_tenant.set(company_id or None)
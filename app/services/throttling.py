@@ -0,0 +1,151 @@
+import math
+
+from collections import OrderedDict
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from services.metrics import Metrics
+
+from settings import settings
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously up to its capacity
+    """
+    def __init__(self, capacity, refill_rate):
+        """
+        :param capacity: the maximum number of tokens in the bucket
+        :param refill_rate: the number of tokens added per second
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = float(capacity)
+        self.updated_at = monotonic()
+
+
+    def consume(self):
+        """
+        Take one token from the bucket
+
+        :return: 0 if a token was taken, otherwise the seconds until one is available
+        """
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+
+        return (1 - self.tokens) / self.refill_rate
+
+
+class BucketRegistry:
+    """
+    A bounded set of token buckets indexed by key, evicting the least recently used
+    """
+    def __init__(self, capacity, refill_rate, max_keys):
+        """
+        :param capacity: the capacity of each bucket
+        :param refill_rate: the refill rate of each bucket in tokens per second
+        :param max_keys: the maximum number of buckets kept in memory
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = Lock()
+
+
+    def consume(self, key):
+        """
+        Take one token from the bucket of the key
+
+        :param key: the key of the bucket
+        :return: 0 if a token was taken, otherwise the seconds until one is available
+        """
+        with self.lock:
+            bucket = self.buckets.get(key)
+
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.capacity, self.refill_rate)
+                if len(self.buckets) > self.max_keys:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+
+            return bucket.consume()
+
+
+def too_many_requests(retry_after, detail):
+    """
+    Build the 429 exception returned when a request is throttled
+
+    :param retry_after: the seconds the client should wait before retrying
+    :param detail: the message returned to the client
+    """
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class LoginThrottle:
+    """
+    Admission control for the login endpoint and password hashing, per worker process
+    """
+    username_buckets = BucketRegistry(
+        settings.LOGIN_USERNAME_BURST,
+        settings.LOGIN_USERNAME_RATE,
+        settings.LOGIN_THROTTLE_MAX_KEYS,
+    )
+    ip_buckets = BucketRegistry(
+        settings.LOGIN_IP_BURST,
+        settings.LOGIN_IP_RATE,
+        settings.LOGIN_THROTTLE_MAX_KEYS,
+    )
+    hash_slots = BoundedSemaphore(settings.MAX_CONCURRENT_HASHES)
+
+    @classmethod
+    def admit(self, username, client_ip):
+        """
+        Check the per-username and per-IP buckets before a login attempt
+
+        :param username: the username of the login attempt
+        :param client_ip: the IP address of the client
+        """
+        retry_after = self.ip_buckets.consume(client_ip)
+        if retry_after:
+            Metrics.increment("login.throttled.ip")
+            raise too_many_requests(retry_after, "Too many login attempts, please try again later.")
+
+        retry_after = self.username_buckets.consume(username)
+        if retry_after:
+            Metrics.increment("login.throttled.username")
+            raise too_many_requests(retry_after, "Too many login attempts, please try again later.")
+
+        Metrics.increment("login.admitted")
+
+
+    @classmethod
+    async def run_hash(self, function, *args):
+        """
+        Run a password hashing function in the threadpool, bounded by the hash cap of the worker
+
+        :param function: the hashing function to run
+        :param args: the arguments of the function
+        """
+        if not self.hash_slots.acquire(blocking=False):
+            Metrics.increment("hash.rejected")
+            raise too_many_requests(1, "The service is busy, please try again later.")
+
+        Metrics.increment("hash.started")
+        try:
+            return await run_in_threadpool(function, *args)
+        finally:
+            self.hash_slots.release()
@@ -0,0 +1,199 @@
+import json
+import os
+import random
+import re
+import sys
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from threading import Lock
+from time import perf_counter
+
+from settings import settings
+
+
+current_span = ContextVar("current_span", default=None)
+
+
+TRACEPARENT_PATTERN = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+TRACE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_id(size):
+    return os.urandom(size).hex()
+
+
+def valid_trace_id(trace_id):
+    """
+    Check that a trace id received from the client is 32 hex characters and not all zeros
+
+    :param trace_id: the trace id received
+    """
+    return TRACE_ID_PATTERN.match(trace_id) is not None and trace_id.strip("0") != ""
+
+
+class Span:
+    """
+    A timed operation belonging to a trace
+    """
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "started_at", "start", "status")
+
+    def __init__(self, trace_id, name, parent_id=None, **attributes):
+        """
+        :param trace_id: the id of the trace
+        :param name: the name of the operation
+        :param parent_id: the id of the parent span
+        :param attributes: the attributes of the operation
+        """
+        self.trace_id = trace_id
+        self.span_id = new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.started_at = datetime.now(timezone.utc)
+        self.start = perf_counter()
+        self.status = "ok"
+
+
+    def child(self, name, **attributes):
+        """
+        Start a span inside this one
+
+        :param name: the name of the operation
+        :param attributes: the attributes of the operation
+        """
+        return Span(self.trace_id, name, self.span_id, **attributes)
+
+
+    def finish(self):
+        """
+        End the span and export it
+        """
+        Tracer.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((perf_counter() - self.start) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        })
+
+
+class Tracer:
+    """
+    Create the spans of the sampled requests and export them as JSON lines
+    """
+    _lock = Lock()
+    _output = None
+
+    @classmethod
+    def export(self, record):
+        """
+        Write a finished span to the configured exporter
+
+        :param record: the span to export
+        """
+        line = json.dumps(record, default=str) + "\n"
+
+        with self._lock:
+            if self._output is None:
+                if settings.TRACING_EXPORTER == "file":
+                    self._output = open(settings.TRACING_FILE, "a", encoding="utf-8")
+                else:
+                    self._output = sys.stdout
+
+            self._output.write(line)
+            self._output.flush()
+
+
+    @classmethod
+    def start_trace(self, headers, name, **attributes):
+        """
+        Start the root span of a request if it is sampled
+
+        :param headers: the headers of the request
+        :param name: the name of the request
+        :param attributes: the attributes of the request
+        :return: the root span or None when the request is not sampled
+        """
+        traceparent = TRACEPARENT_PATTERN.match(headers.get("traceparent", "").strip().lower())
+
+        if traceparent:
+            version, trace_id, parent_id, flags = traceparent.groups()
+            if version != "ff" and valid_trace_id(trace_id) and parent_id.strip("0"):
+                sampled = int(flags, 16) & 1 or random.random() < settings.TRACING_SAMPLE_RATE
+                return Span(trace_id, name, parent_id, **attributes) if sampled else None
+
+        if random.random() >= settings.TRACING_SAMPLE_RATE:
+            return None
+
+        trace_id = headers.get("x-trace-id", "").strip().lower()
+        return Span(trace_id if valid_trace_id(trace_id) else new_id(16), name, **attributes)
+
+
+    @classmethod
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Trace an operation as a child of the current span, doing nothing outside a sampled trace
+
+        :param name: the name of the operation
+        :param attributes: the attributes of the operation
+        """
+        parent = current_span.get()
+
+        if parent is None:
+            yield None
+            return
+
+        span = parent.child(name, **attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            current_span.reset(token)
+            span.finish()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a trace per request and returning its id in the X-Trace-Id header
+    """
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        span = Tracer.start_trace(headers, f"HTTP {scope['method']}", path=scope["path"])
+
+        if span is None:
+            return await self.app(scope, receive, send)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.attributes["status_code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", span.trace_id.encode())]
+            await send(message)
+
+        token = current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            current_span.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"HTTP {scope['method']} {route.path}"
+            span.finish()
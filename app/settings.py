@@ -1,5 +1,7 @@
 import os
 
+from typing import Optional
+
 from dotenv import load_dotenv
 
 from pydantic_settings import BaseSettings
@@ -20,11 +22,48 @@ class Settings(BaseSettings):
     DEBUG: bool = bool(int(os.getenv("DEBUG", 0)))
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS").split(",")
 
+    # Server
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", 8000))
+    WORKERS: int = int(os.getenv("WORKERS", os.cpu_count() or 1))
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+    PROXY_HEADERS: bool = bool(int(os.getenv("PROXY_HEADERS", 1)))
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+    # Monitoring
+    LOOP_MONITOR_ENABLED: bool = bool(int(os.getenv("LOOP_MONITOR_ENABLED", 1)))
+    LOOP_LAG_INTERVAL_MS: float = float(os.getenv("LOOP_LAG_INTERVAL_MS", 100))
+    LOOP_BLOCK_THRESHOLD_MS: float = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", 250))
+    MEMORY_PROFILING_ENABLED: bool = bool(int(os.getenv("MEMORY_PROFILING_ENABLED", 0)))
+    MEMORY_PEAK_THRESHOLD_KB: int = int(os.getenv("MEMORY_PEAK_THRESHOLD_KB", 1024))
+
+    # Tracing
+    TRACING_ENABLED: bool = bool(int(os.getenv("TRACING_ENABLED", 0)))
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", 1))
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "stdout")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
+
+    # Storage
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "mongo")
+    MEMORY_STORAGE_INDEXES: str = os.getenv("MEMORY_STORAGE_INDEXES", "id,username")
+
     # Mongo
-    MONGO_URL: str = os.getenv("MONGO_URL")
-    MONGO_SSL: bool = bool(int(os.getenv("MONGO_SSL")))
-    PATH_CERT: str = os.getenv("PATH_CERT")
-    DATABASE_ENVIRONMENT: str = os.getenv("DATABASE_ENVIRONMENT")
+    MONGO_URL: Optional[str] = os.getenv("MONGO_URL")
+    MONGO_SSL: bool = bool(int(os.getenv("MONGO_SSL", 0)))
+    PATH_CERT: Optional[str] = os.getenv("PATH_CERT")
+    DATABASE_ENVIRONMENT: Optional[str] = os.getenv("DATABASE_ENVIRONMENT")
+    MONGO_DIRECT_CONNECTION: bool = bool(int(os.getenv("MONGO_DIRECT_CONNECTION", 1)))
+    MONGO_LIST_READ_PREFERENCE: str = os.getenv("MONGO_LIST_READ_PREFERENCE", "secondaryPreferred")
+    MONGO_CAUSAL_CONSISTENCY: bool = bool(int(os.getenv("MONGO_CAUSAL_CONSISTENCY", 1)))
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 100))
+    SLOW_QUERY_EXPLAIN_TOP: int = int(os.getenv("SLOW_QUERY_EXPLAIN_TOP", 5))
+
+    # Tenants
+    TENANT_CACHE_SIZE: int = int(os.getenv("TENANT_CACHE_SIZE", 64))
+    TENANT_IDLE_SECONDS: int = int(os.getenv("TENANT_IDLE_SECONDS", 900))
+    TENANT_MAX_POOL_SIZE: int = int(os.getenv("TENANT_MAX_POOL_SIZE", 10))
+    TENANT_CLOSE_DELAY_SECONDS: int = int(os.getenv("TENANT_CLOSE_DELAY_SECONDS", 60))
+    TENANT_DATABASE_TEMPLATE: str = os.getenv("TENANT_DATABASE_TEMPLATE", "{database}_{company_id}")
 
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY")
@@ -33,4 +72,17 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
     REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES"))
 
+    # Idempotency
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+    IDEMPOTENCY_LOCK_SECONDS: int = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 60))
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000))
+
+    # Login throttling
+    LOGIN_USERNAME_BURST: int = int(os.getenv("LOGIN_USERNAME_BURST", 5))
+    LOGIN_USERNAME_RATE: float = float(os.getenv("LOGIN_USERNAME_RATE", 0.1))
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", 20))
+    LOGIN_IP_RATE: float = float(os.getenv("LOGIN_IP_RATE", 1))
+    LOGIN_THROTTLE_MAX_KEYS: int = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", 100000))
+    MAX_CONCURRENT_HASHES: int = int(os.getenv("MAX_CONCURRENT_HASHES", max(1, (os.cpu_count() or 1) // max(1, WORKERS))))
+
 settings = Settings()
@@ -2,7 +2,9 @@ from datetime import datetime
 
 from pymongo import ReturnDocument
 
-from database import database, Collections
+from settings import settings
+
+from database import get_storage, Collections, coalesce, profiled
 
 
 class Users:
@@ -11,6 +13,34 @@ class Users:
     """
 
     @classmethod
+    def storage(self):
+        """
+        Method to get the storage of the users collection
+
+        :return: The storage configured in the settings
+        """
+        return get_storage(Collections.USERS)
+
+
+    @classmethod
+    def explain(self, query, reject=None):
+        """
+        Method to explain the plan of a query
+
+        :param query: The query to explain
+        :type query: dict
+
+        :param reject: The fields to reject
+        :type reject: dict
+
+        :return: The winning plan and execution stats of the query
+        """
+        return self.storage().explain(query, reject)
+
+
+    @classmethod
+    @coalesce
+    @profiled
     def find_one(self, query, reject):
         """
         Method to find a user by a query and reject some fields
@@ -23,10 +53,12 @@ class Users:
 
         :return: The user found if exists or None
         """
-        return database[Collections.USERS].find_one(query, reject)
+        return self.storage().find_one(query, reject)
     
 
     @classmethod
+    @coalesce
+    @profiled
     def find(self, query, reject):
         """
         Method to find users by a query and reject some fields
@@ -37,12 +69,13 @@ class Users:
         :param reject: The fields to reject
         :type reject: dict
 
-        :return: The users found if exists or None
+        :return: The list of users found
         """
-        return database[Collections.USERS].find(query, reject)
+        return self.storage().find(query, reject, settings.MONGO_LIST_READ_PREFERENCE)
     
 
     @classmethod
+    @profiled
     def insert_one(self, user_data):
         """
         Method to insert a user
@@ -52,10 +85,11 @@ class Users:
 
         :return: The user inserted
         """
-        return database[Collections.USERS].insert_one(user_data)
+        return self.storage().insert_one(user_data)
 
 
     @classmethod
+    @profiled
     def update_one(self, query, update):
         """
         Method to update a user
@@ -68,7 +102,7 @@ class Users:
 
         :return: The user updated
         """
-        return database[Collections.USERS].find_one_and_update(
+        return self.storage().find_one_and_update(
             query,
             update,
             return_document=ReturnDocument.AFTER,
@@ -76,6 +110,7 @@ class Users:
     
 
     @classmethod
+    @profiled
     def update_many(self, query, update):
         """
         Method to update users
@@ -86,13 +121,14 @@ class Users:
         :param update: The update to apply
         :type update: dict
         """
-        return database[Collections.USERS].update_many(
+        return self.storage().update_many(
             query,
             update,
         )
     
 
     @classmethod
+    @profiled
     def deactivate_one(self, query):
         """
         Method to deactivate a user
@@ -102,7 +138,7 @@ class Users:
 
         :return: The user deactivated
         """
-        return database[Collections.USERS].update_one(
+        return self.storage().update_one(
             query,
             {
                 "$set": {
@@ -114,6 +150,7 @@ class Users:
 
 
     @classmethod
+    @profiled
     def deactivate_many(self, query):
         """
         Method to deactivate users
@@ -121,7 +158,7 @@ class Users:
         :param query: The query to find the users
         :type query: dict
         """
-        return database[Collections.USERS].update_many(
+        return self.storage().update_many(
             query,
             {
                 "$set": {
@@ -132,6 +169,7 @@ class Users:
         )
     
     @classmethod
+    @profiled
     def activate_one(self, query):
         """
         Method to activate a user
@@ -141,7 +179,7 @@ class Users:
 
         :return: The user activated
         """
-        return database[Collections.USERS].update_one(
+        return self.storage().update_one(
             query,
             {
                 "$set": {
@@ -156,6 +194,7 @@ class Users:
     
 
     @classmethod
+    @profiled
     def activate_many(self, query):
         """
         Method to activate users
@@ -163,7 +202,7 @@ class Users:
         :param query: The query to find the users
         :type query: dict
         """
-        return database[Collections.USERS].update_many(
+        return self.storage().update_many(
             query,
             {
                 "$set": {
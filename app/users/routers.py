@@ -5,14 +5,18 @@ from datetime import datetime
 from fastapi import APIRouter, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
-from services.security import set_password_hash, AuthenticatedRoute
+from services.security import set_password_hash
+from services.throttling import LoginThrottle
+
+from idempotency import IdempotentRoute
 
 from users.models import Users
 from users.schemas import RegisterUserModel, ReturnRegisterUserModel, UserModel, UserPatchModel
 
 
-user_router = APIRouter(prefix="/users", tags=["Users"], route_class=AuthenticatedRoute)
+user_router = APIRouter(prefix="/users", tags=["Users"], route_class=IdempotentRoute)
 
 
 @user_router.post("/register", status_code=status.HTTP_201_CREATED, response_model=ReturnRegisterUserModel, summary="Endpoint to register a new user.")
@@ -23,6 +27,9 @@ async def register_user(data: RegisterUserModel):
     :param data: users.schemas.RegisterUserModel - The Register user model.\n
     :return: Message - User Registered Successfuly
 
+    ## Headers
+    - **Idempotency-Key**: Optional key returning the stored response when the request is retried.
+
     ## Request Body
     - **username**: The username of the user.
     - **password**: The password of the user. Must contain at least 8 characters, one digit, one uppercase letter, one lowercase letter and one special character.
@@ -36,9 +43,10 @@ async def register_user(data: RegisterUserModel):
     ## Responses
     - **200 OK**: Returns a message the user registered successfuly and user_id.
     - **422 Unprocessable Entity**: If any type of error occurs.
+    - **429 Too Many Requests**: If the hashing capacity is exhausted.
     """
 
-    data.password = set_password_hash(data.password)
+    data.password = await LoginThrottle.run_hash(set_password_hash, data.password)
 
     payload = data.model_dump()
 
@@ -71,14 +79,14 @@ async def get_users():
     - **200 OK**: if not users on database to be returned empty array.
     """
 
-    users = Users.find({}, {"_id": 0})
+    users = await run_in_threadpool(Users.find, {}, {"_id": 0})
 
     if not users:
         return JSONResponse(status_code=status.HTTP_200_OK, content=jsonable_encoder([]))
 
-    return_users = [UserModel(**user) for user in users]
+    return_users = UserModel.from_database_many(users)
 
-    return JSONResponse(status_code=status.HTTP_200_OK, content=jsonable_encoder(return_users))
+    return JSONResponse(status_code=status.HTTP_200_OK, content=[user.model_dump(mode="json") for user in return_users])
 
 
 @user_router.get("/{user_id}", status_code=status.HTTP_200_OK, response_model=UserModel, summary="Endpoint to get a user by id.")
@@ -94,7 +102,7 @@ async def get_user(user_id: str):
     - **404 Not Found**: User Not Found.
     """
 
-    user = Users.find_one({"id": user_id}, {"_id": 0})
+    user = await run_in_threadpool(Users.find_one, {"id": user_id}, {"_id": 0})
 
     if not user:
         return JSONResponse(
@@ -102,9 +110,9 @@ async def get_user(user_id: str):
             content={"message": f"User Not Found", "content": {"user_id": user_id}}
         )
 
-    return_user = UserModel(**user)
+    return_user = UserModel.from_database(user)
 
-    return JSONResponse(status_code=status.HTTP_200_OK, content=jsonable_encoder(return_user))
+    return JSONResponse(status_code=status.HTTP_200_OK, content=return_user.model_dump(mode="json"))
 
 
 @user_router.patch("/{user_id}", status_code=status.HTTP_200_OK, response_model=UserModel, summary="Endpoint to update a user by id.")
@@ -145,13 +153,13 @@ async def update_user(user_id: str, data: UserPatchModel):
 
     user = Users.update_one({"id": user_id}, {"$set": payload})
     
-    return_user = UserModel(**user)
+    return_user = UserModel.from_database(user)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={
             "message": "User Updated Successfuly",
-            "user": jsonable_encoder(return_user),
+            "user": return_user.model_dump(mode="json"),
         }
     )
 
@@ -109,6 +109,26 @@ class UserModel(BaseModel):
     activated_at: Optional[str] = Field(None, title="activated_at")
     deactivated_at: Optional[str] = Field(None, title="deactivated_at")
 
+    @classmethod
+    def from_database(cls, document):
+        """
+        Build the model from a document read from the database without revalidating it
+
+        :param document: The user document stored by the application
+        """
+        return cls.model_construct(**{field: document[field] for field in cls.model_fields if field in document})
+
+    @classmethod
+    def from_database_many(cls, documents):
+        """
+        Build the models from documents read from the database without revalidating them
+
+        :param documents: The user documents stored by the application
+        """
+        fields = tuple(cls.model_fields)
+        construct = cls.model_construct
+        return [construct(**{field: document[field] for field in fields if field in document}) for document in documents]
+
 
 class UserPatchModel(BaseModel):
     """
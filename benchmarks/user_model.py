@@ -0,0 +1,68 @@
+"""
+Microbenchmark comparing validated and trusted construction of UserModel lists.
+
+Run from the repository root with: python benchmarks/user_model.py [number_of_users]
+"""
+import os
+import sys
+
+from timeit import timeit
+from uuid import uuid4
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+os.environ.setdefault("APP_NAME", "backoffice-benchmark")
+os.environ.setdefault("APP_DESCRIPTION", "UserModel microbenchmark")
+os.environ.setdefault("CORS_ORIGINS", '["*"]')
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("PATH_CERT", "")
+os.environ.setdefault("DATABASE_ENVIRONMENT", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("REFRESH_SECRET_KEY", "benchmark-refresh-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_MINUTES", "60")
+
+from fastapi.encoders import jsonable_encoder
+
+from users.schemas import UserModel
+
+
+def build_documents(size):
+    return [
+        {
+            "id": str(uuid4()),
+            "username": f"user{index}",
+            "password": "$2b$12$hash",
+            "email": f"user{index}@example.com",
+            "first_name": "First",
+            "last_name": "Last",
+            "cpf": "00000000000",
+            "phone": "5500000000000",
+            "role_id": "admin",
+            "is_active": True,
+            "created_at": "2024-01-01T00:00:00",
+        }
+        for index in range(size)
+    ]
+
+
+def validated(documents):
+    return jsonable_encoder([UserModel(**document) for document in documents])
+
+
+def trusted(documents):
+    return [user.model_dump(mode="json") for user in UserModel.from_database_many(documents)]
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    documents = build_documents(size)
+    number = 20
+
+    assert validated(documents) == trusted(documents)
+
+    for name, function in (("validated", validated), ("trusted", trusted)):
+        seconds = timeit(lambda: function(documents), number=number)
+        print(f"{name:>10}: {seconds / number * 1000:8.3f} ms per {size} users")
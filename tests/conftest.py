@@ -0,0 +1,180 @@
+import os
+
+os.environ.setdefault("APP_NAME", "backoffice-test")
+os.environ.setdefault("APP_DESCRIPTION", "Backoffice test suite")
+os.environ.setdefault("CORS_ORIGINS", '["*"]')
+os.environ.setdefault("STORAGE_BACKEND", "mongo")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("PATH_CERT", "")
+os.environ.setdefault("DATABASE_ENVIRONMENT", "test")
+os.environ.setdefault("SECRET_KEY", "secret")
+os.environ.setdefault("REFRESH_SECRET_KEY", "refresh-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_MINUTES", "60")
+
+from copy import deepcopy
+
+import pytest
+
+from bson import ObjectId
+from bson.timestamp import Timestamp
+from pymongo import ReadPreference, ReturnDocument
+from pymongo.results import InsertOneResult, UpdateResult
+
+from database import BaseConnection
+from database.sessions import causal_state
+
+
+class StandInSession:
+    """
+    Causally consistent session of the replica set stand-in
+    """
+    def __init__(self):
+        self.operation_time = None
+        self.cluster_time = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        return False
+
+
+    def advance_cluster_time(self, cluster_time):
+        if not isinstance(cluster_time.get("clusterTime"), Timestamp):
+            raise TypeError("clusterTime must contain a Timestamp")
+        if self.cluster_time is None or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]:
+            self.cluster_time = cluster_time
+
+
+    def advance_operation_time(self, operation_time):
+        if not isinstance(operation_time, Timestamp):
+            raise TypeError("operationTime must be a Timestamp")
+        if self.operation_time is None or operation_time > self.operation_time:
+            self.operation_time = operation_time
+
+
+class StandInDatabase:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+
+    def __getitem__(self, name):
+        return StandInCollection(self, name)
+
+
+class StandInCollection:
+    """
+    Collection of the replica set stand-in, reading from the node chosen by its read preference
+    """
+    def __init__(self, database, name, read_preference=ReadPreference.PRIMARY):
+        self.database = database
+        self.name = name
+        self.read_preference = read_preference
+
+
+    def with_options(self, read_preference):
+        return StandInCollection(self.database, self.name, read_preference)
+
+
+    def _documents(self, session):
+        return self.database.client.read(self.name, self.read_preference, session)
+
+
+    def find_one(self, query, projection=None, session=None):
+        found = self.find(query, projection, session=session)
+        return found[0] if found else None
+
+
+    def find(self, query, projection=None, session=None):
+        found = []
+        for document in self._documents(session):
+            if all(document.get(key) == value for key, value in query.items()):
+                found.append({key: value for key, value in deepcopy(document).items() if not projection or key not in projection})
+        return found
+
+
+    def insert_one(self, document, session=None):
+        document.setdefault("_id", ObjectId())
+        self.database.client.write(self.name, lambda documents: documents.append(deepcopy(document)), session)
+        return InsertOneResult(document["_id"], True)
+
+
+    def find_one_and_update(self, query, update, return_document=ReturnDocument.BEFORE, session=None):
+        def apply(documents):
+            for document in documents:
+                if all(document.get(key) == value for key, value in query.items()):
+                    document.update(update.get("$set", {}))
+                    return
+
+        self.database.client.write(self.name, apply, session)
+        return self.find_one(query, session=session)
+
+
+    def update_one(self, query, update, session=None):
+        self.find_one_and_update(query, update, session=session)
+        return UpdateResult({"n": 1, "nModified": 1, "ok": 1.0}, True)
+
+
+class ReplicaSetStandIn:
+    """
+    Client of a two node replica set whose secondary only replicates when a causal read waits for it
+    """
+    def __init__(self):
+        self.clock = 0
+        self.primary = {}
+        self.secondary = {}
+        self.secondary_time = Timestamp(0, 0)
+        self.oplog = []
+        self.reads = []
+
+
+    def __getitem__(self, name):
+        return StandInDatabase(self, name)
+
+
+    def start_session(self, causal_consistency=False):
+        return StandInSession()
+
+
+    def write(self, collection, apply, session):
+        apply(self.primary.setdefault(collection, []))
+        self.clock += 1
+        timestamp = Timestamp(self.clock, 0)
+        self.oplog.append((timestamp, collection, apply))
+
+        if session is not None:
+            session.advance_operation_time(timestamp)
+            session.advance_cluster_time({"clusterTime": timestamp, "signature": {"keyId": 0}})
+
+
+    def replicate(self, until):
+        for timestamp, collection, apply in self.oplog:
+            if self.secondary_time < timestamp <= until:
+                apply(self.secondary.setdefault(collection, []))
+                self.secondary_time = timestamp
+
+
+    def read(self, collection, read_preference, session):
+        self.reads.append(read_preference.mongos_mode)
+
+        if read_preference.mode == ReadPreference.PRIMARY.mode:
+            return self.primary.get(collection, [])
+
+        if session is not None and session.operation_time is not None:
+            self.replicate(session.operation_time)
+
+        return self.secondary.get(collection, [])
+
+
+@pytest.fixture
+def replica_set(monkeypatch):
+    client = ReplicaSetStandIn()
+    monkeypatch.setattr(BaseConnection, "connection", client)
+    token = causal_state.set(None)
+    yield client
+    causal_state.reset(token)
@@ -0,0 +1,54 @@
+import json
+
+from base64 import urlsafe_b64encode
+
+from settings import settings
+
+from database.sessions import causal_state, decode_token
+
+from users.models import Users
+
+
+def request_state(token=None):
+    state = {"token": token, "outgoing": None}
+    causal_state.set(state)
+    return state
+
+
+def test_list_reads_use_the_list_read_preference(replica_set):
+    Users.find({}, {"_id": 0})
+
+    assert replica_set.reads == [settings.MONGO_LIST_READ_PREFERENCE]
+
+
+def test_find_one_stays_on_the_primary(replica_set):
+    Users.insert_one({"id": "1", "username": "primary"})
+
+    user = Users.find_one({"id": "1"}, {"_id": 0})
+
+    assert replica_set.reads == ["primary"]
+    assert user["username"] == "primary"
+
+
+def test_causal_token_reads_own_write_from_secondary(replica_set):
+    write = request_state()
+    Users.insert_one({"id": "1", "username": "causal"})
+
+    assert write["outgoing"]
+
+    request_state()
+    assert Users.find({"id": "1"}, {"_id": 0}) == []
+
+    request_state(decode_token(write["outgoing"]))
+    assert Users.find({"id": "1"}, {"_id": 0}) == [{"id": "1", "username": "causal"}]
+
+
+def test_invalid_causal_tokens_are_ignored(replica_set):
+    forged = urlsafe_b64encode(json.dumps({"operationTime": 1, "clusterTime": 1}).encode()).decode()
+
+    assert decode_token(forged) is None
+    assert decode_token("not a token") is None
+    assert decode_token(urlsafe_b64encode(b"[]").decode()) is None
+
+    request_state(decode_token(forged))
+    assert Users.find({}, {"_id": 0}) == []